@@ -3,31 +3,43 @@ import logging
 from telegram import Update, Bot
 from telegram.ext import Application, CommandHandler, ContextTypes
 import os
-import sqlite3
-from datetime import datetime
+import signal
+import time
+import aiosqlite
+from datetime import datetime, timedelta
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+SQL_STATS_TOTALS = """
+                   SELECT COUNT(*),
+                          AVG(price),
+                          MIN(price),
+                          SUM(CASE WHEN created_at >= ? THEN 1 ELSE 0 END)
+                   FROM apartments
+                   """
 
-class ApartmentBot:
-    def __init__(self, token: str):
-        self.token = token
-        self.db_path = "data/apartments.db"
-        self.application = Application.builder().token(token).build()
-        self.setup_handlers()
+SQL_STATS_BY_SOURCE = "SELECT source, COUNT(*) FROM apartments GROUP BY source"
 
-    def setup_handlers(self):
-        """Настройка обработчиков команд"""
-        self.application.add_handler(CommandHandler("start", self.start_command))
-        self.application.add_handler(CommandHandler("help", self.help_command))
-        self.application.add_handler(CommandHandler("stats", self.stats_command))
-        self.application.add_handler(CommandHandler("recent", self.recent_command))
-        self.application.add_handler(CommandHandler("cheap", self.cheap_command))
+SQL_RECENT = """
+             SELECT title, price, location, source, url, created_at
+             FROM apartments
+             ORDER BY id DESC LIMIT 5
+             """
 
-    async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Команда /start"""
-        welcome_message = """
+SQL_CHEAP = """
+            SELECT title, price, location, source, url, created_at
+            FROM apartments
+            ORDER BY price ASC LIMIT 5
+            """
+
+STATS_CACHE_TTL = 30.0
+LIST_CACHE_TTL = 10.0
+
+SEND_INTERVAL = 1 / 28  # чуть ниже лимита Telegram в 30 сообщений/с
+DUPLICATE_WINDOW = 5.0
+
+WELCOME_MESSAGE = """
 🏠 *Добро пожаловать в бот мониторинга квартир!*
 
 Я помогу вам отслеживать новые предложения аренды квартир в Новосибирске дешевле 30,000 ₽.
@@ -39,13 +51,9 @@ class ApartmentBot:
 /cheap - Самые дешевые квартиры
 
 Бот автоматически мониторит Avito и Cian каждые 10 минут.
-        """.strip()
-
-        await update.message.reply_text(welcome_message, parse_mode='Markdown')
+""".strip()
 
-    async def help_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Команда /help"""
-        help_message = """
+HELP_MESSAGE = """
 🤖 *Помощь по боту мониторинга квартир*
 
 *Команды:*
@@ -65,38 +73,151 @@ class ApartmentBot:
 • Cian.ru
 
 Если у вас есть вопросы, обратитесь к администратору.
-        """.strip()
+""".strip()
 
-        await update.message.reply_text(help_message, parse_mode='Markdown')
 
-    async def stats_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Команда /stats"""
-        try:
-            conn = sqlite3.connect(self.db_path, timeout=30.0)
-            cursor = conn.cursor()
+MD_ESCAPE = str.maketrans({c: '\\' + c for c in '_*[`'})
+
+
+def shorten_title(title: str) -> str:
+    """Обрезка длинного заголовка с экранированием Markdown-символов"""
+    short = title[:50] + '...' if len(title) > 50 else title
+    return short.translate(MD_ESCAPE)
+
+
+def format_apartment_list(header: str, apartments) -> str:
+    """Форматирование списка квартир для ответа бота"""
+    parts = [header, "\n\n"]
+
+    for i, (title, price, location, source, url, created_at) in enumerate(apartments, 1):
+        parts.append(f"""
+{i}. *{shorten_title(title)}*
+💰 {price:,} ₽ | 📍 {location}
+🌐 {source} | ⏰ {created_at}
+🔗 [Посмотреть]({url})
 
-            cursor.execute("SELECT COUNT(*) FROM apartments")
-            total_count = cursor.fetchone()[0]
+        """.strip() + "\n\n")
 
-            cursor.execute("SELECT source, COUNT(*) FROM apartments GROUP BY source")
-            source_stats = cursor.fetchall()
+    return "".join(parts)
 
-            cursor.execute("SELECT AVG(price) FROM apartments")
-            avg_price = cursor.fetchone()[0] or 0
 
-            cursor.execute("SELECT MIN(price) FROM apartments")
-            min_price = cursor.fetchone()[0] or 0
+class ApartmentBot:
+    def __init__(self, token: str):
+        self.token = token
+        self.db_path = "data/apartments.db"
+        self.db: aiosqlite.Connection = None
+        self._message_cache = {}
+        self._inflight = {}
+        self._send_q = asyncio.Queue()
+        self._send_task = None
+        self._last_sent = {}
+        self.application = Application.builder().token(token).build()
+        self.setup_handlers()
 
-            cursor.execute("""
-                           SELECT COUNT(*)
-                           FROM apartments
-                           WHERE created_at >= datetime('now', '-1 day')
-                           """)
-            last_24h = cursor.fetchone()[0]
+    async def connect_db(self):
+        """Открытие общего соединения с базой данных"""
+        self.db = await aiosqlite.connect(self.db_path)
+        await self.db.execute("PRAGMA journal_mode=WAL")
+        await self.db.execute("PRAGMA synchronous=NORMAL")
+        await self.db.execute("PRAGMA temp_store=MEMORY")
+        await self.db.execute("PRAGMA cache_size=-64000")
 
-            conn.close()
+        try:
+            await self.db.execute("""
+                                  CREATE INDEX IF NOT EXISTS idx_apartments_price
+                                      ON apartments (price, title, location, source, url, created_at)
+                                  """)
+            await self.db.execute("""
+                                  CREATE INDEX IF NOT EXISTS idx_apartments_created
+                                      ON apartments (id DESC, title, price, location, source, url, created_at)
+                                  """)
+            await self.db.execute("CREATE INDEX IF NOT EXISTS idx_apartments_created_at ON apartments (created_at)")
+            await self.db.execute("ANALYZE apartments")
+            await self.db.commit()
+        except aiosqlite.OperationalError as e:
+            logger.warning(f"Не удалось создать индексы (монитор ещё не создал таблицу?): {e}")
+
+    async def get_cached_message(self, key: str, ttl: float, builder) -> str:
+        """Получение ответа из кэша с обновлением по истечении TTL.
+
+        Одновременные промахи сворачиваются в один запрос к БД: первая
+        корутина выполняет builder, остальные ждут её результат.
+        """
+        cached = self._message_cache.get(key)
+        if cached and time.monotonic() - cached[0] < ttl:
+            return cached[1]
+
+        future = self._inflight.get(key)
+        if future is not None:
+            return await future
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            message = await builder()
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # исключение уходит ожидающим, без предупреждения asyncio
+            raise
+        else:
+            self._message_cache[key] = (time.monotonic(), message)
+            future.set_result(message)
+            return message
+        finally:
+            del self._inflight[key]
 
-            stats_message = f"""
+    def setup_handlers(self):
+        """Настройка обработчиков команд"""
+        self.application.add_handler(CommandHandler("start", self.start_command))
+        self.application.add_handler(CommandHandler("help", self.help_command))
+        self.application.add_handler(CommandHandler("stats", self.stats_command))
+        self.application.add_handler(CommandHandler("recent", self.recent_command))
+        self.application.add_handler(CommandHandler("cheap", self.cheap_command))
+
+    async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Команда /start"""
+        self.queue_reply(update, WELCOME_MESSAGE, parse_mode='Markdown')
+
+    async def help_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Команда /help"""
+        self.queue_reply(update, HELP_MESSAGE, parse_mode='Markdown')
+
+    def queue_reply(self, update: Update, text: str, **kwargs):
+        """Постановка ответа в очередь отправки"""
+        self._send_q.put_nowait((update.effective_chat.id, text, kwargs))
+
+    async def _send_worker(self):
+        """Фоновая отправка ответов с соблюдением лимита Telegram"""
+        while True:
+            chat_id, text, kwargs = await self._send_q.get()
+
+            last = self._last_sent.get(chat_id)
+            if last and last[0] == hash(text) and time.monotonic() - last[1] < DUPLICATE_WINDOW:
+                self._send_q.task_done()
+                continue
+
+            try:
+                await self.application.bot.send_message(chat_id=chat_id, text=text, **kwargs)
+                self._last_sent[chat_id] = (hash(text), time.monotonic())
+            except Exception as e:
+                logger.error(f"Ошибка отправки сообщения в чат {chat_id}: {e}")
+
+            self._send_q.task_done()
+            await asyncio.sleep(SEND_INTERVAL)
+
+    async def _build_stats_message(self) -> str:
+        """Сбор статистики из БД и форматирование ответа /stats"""
+        cutoff = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d %H:%M:%S')
+        async with self.db.execute(SQL_STATS_TOTALS, (cutoff,)) as cursor:
+            total_count, avg_price, min_price, last_24h = await cursor.fetchone()
+        avg_price = avg_price or 0
+        min_price = min_price or 0
+        last_24h = last_24h or 0
+
+        async with self.db.execute(SQL_STATS_BY_SOURCE) as cursor:
+            source_stats = await cursor.fetchall()
+
+        stats_message = f"""
 📊 *Статистика мониторинга квартир*
 
 📈 *Общая статистика:*
@@ -106,105 +227,84 @@ class ApartmentBot:
 • Минимальная цена: {min_price:,.0f} ₽
 
 📋 *По источникам:*
-            """.strip()
+        """.strip()
 
-            for source, count in source_stats:
-                stats_message += f"\n• {source}: {count} квартир"
+        for source, count in source_stats:
+            stats_message += f"\n• {source}: {count} квартир"
 
-            await update.message.reply_text(stats_message, parse_mode='Markdown')
+        return stats_message
 
-        except Exception as e:
-            logger.error(f"Ошибка при получении статистики: {e}")
-            await update.message.reply_text("❌ Ошибка при получении статистики")
+    async def _build_recent_message(self) -> str:
+        """Выборка последних квартир и форматирование ответа /recent"""
+        async with self.db.execute(SQL_RECENT) as cursor:
+            apartments = await cursor.fetchmany(5)
 
-    async def recent_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Команда /recent"""
-        try:
-            conn = sqlite3.connect(self.db_path, timeout=30.0)
-            cursor = conn.cursor()
-
-            cursor.execute("""
-                           SELECT title, price, location, source, url, created_at
-                           FROM apartments
-                           ORDER BY id DESC LIMIT 5
-                           """)
-
-            apartments = cursor.fetchall()
-            conn.close()
+        if not apartments:
+            return "🔍 Пока не найдено ни одной квартиры"
 
-            if not apartments:
-                await update.message.reply_text("🔍 Пока не найдено ни одной квартиры")
-                return
+        return format_apartment_list("🕐 *Последние найденные квартиры:*", apartments)
 
-            message = "🕐 *Последние найденные квартиры:*\n\n"
+    async def _build_cheap_message(self) -> str:
+        """Выборка самых дешевых квартир и форматирование ответа /cheap"""
+        async with self.db.execute(SQL_CHEAP) as cursor:
+            apartments = await cursor.fetchmany(5)
 
-            for i, (title, price, location, source, url, created_at) in enumerate(apartments, 1):
-                message += f"""
-{i}. *{title[:50]}{'...' if len(title) > 50 else ''}*
-💰 {price:,} ₽ | 📍 {location}
-🌐 {source} | ⏰ {created_at}
-🔗 [Посмотреть]({url})
+        if not apartments:
+            return "🔍 Пока не найдено ни одной квартиры"
 
-                """.strip() + "\n\n"
+        return format_apartment_list("💰 *Самые дешевые квартиры:*", apartments)
 
-            await update.message.reply_text(message, parse_mode='Markdown', disable_web_page_preview=True)
+    async def stats_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Команда /stats"""
+        try:
+            message = await self.get_cached_message("stats", STATS_CACHE_TTL, self._build_stats_message)
+            self.queue_reply(update, message, parse_mode='Markdown')
+        except Exception as e:
+            logger.error(f"Ошибка при получении статистики: {e}")
+            self.queue_reply(update, "❌ Ошибка при получении статистики")
 
+    async def recent_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Команда /recent"""
+        try:
+            message = await self.get_cached_message("recent", LIST_CACHE_TTL, self._build_recent_message)
+            self.queue_reply(update, message, parse_mode='Markdown', disable_web_page_preview=True)
         except Exception as e:
             logger.error(f"Ошибка при получении последних квартир: {e}")
-            await update.message.reply_text("❌ Ошибка при получении данных")
+            self.queue_reply(update, "❌ Ошибка при получении данных")
 
     async def cheap_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Команда /cheap"""
         try:
-            conn = sqlite3.connect(self.db_path, timeout=30.0)
-            cursor = conn.cursor()
-
-            cursor.execute("""
-                           SELECT title, price, location, source, url, created_at
-                           FROM apartments
-                           ORDER BY price ASC LIMIT 5
-                           """)
-
-            apartments = cursor.fetchall()
-            conn.close()
-
-            if not apartments:
-                await update.message.reply_text("🔍 Пока не найдено ни одной квартиры")
-                return
-
-            message = "💰 *Самые дешевые квартиры:*\n\n"
-
-            for i, (title, price, location, source, url, created_at) in enumerate(apartments, 1):
-                message += f"""
-{i}. *{title[:50]}{'...' if len(title) > 50 else ''}*
-💰 {price:,} ₽ | 📍 {location}
-🌐 {source} | ⏰ {created_at}
-🔗 [Посмотреть]({url})
-
-                """.strip() + "\n\n"
-
-            await update.message.reply_text(message, parse_mode='Markdown', disable_web_page_preview=True)
-
+            message = await self.get_cached_message("cheap", LIST_CACHE_TTL, self._build_cheap_message)
+            self.queue_reply(update, message, parse_mode='Markdown', disable_web_page_preview=True)
         except Exception as e:
             logger.error(f"Ошибка при получении дешевых квартир: {e}")
-            await update.message.reply_text("❌ Ошибка при получении данных")
+            self.queue_reply(update, "❌ Ошибка при получении данных")
 
     async def run(self):
         """Запуск бота"""
         logger.info("Запуск Telegram бота...")
+        await self.connect_db()
         await self.application.initialize()
         await self.application.start()
         await self.application.updater.start_polling()
 
+        self._send_task = asyncio.create_task(self._send_worker())
+
+        stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop_event.set)
+
         try:
-            while True:
-                await asyncio.sleep(1)
-        except KeyboardInterrupt:
+            await stop_event.wait()
             logger.info("Остановка бота...")
         finally:
+            self._send_task.cancel()
             await self.application.updater.stop()
             await self.application.stop()
             await self.application.shutdown()
+            await self.db.close()
 
 
 async def main():
@@ -20,10 +20,17 @@ class Config:
     cian_url: str = "https://novosibirsk.cian.ru/cat.php?deal_type=rent&engine_version=2&foot_min=15&metro%5B0%5D=248&metro%5B1%5D=249&metro%5B2%5D=250&metro%5B3%5D=251&metro%5B4%5D=252&metro%5B5%5D=257&metro%5B6%5D=258&offer_type=flat&only_foot=2&room3=1&sort=price_object_order&type=4"
     
     def __post_init__(self):
-        self.telegram_bot_token = os.getenv('TELEGRAM_BOT_TOKEN', self.telegram_bot_token)
-        self.telegram_channel_id = os.getenv('TELEGRAM_CHANNEL_ID', self.telegram_channel_id)
-        self.database_path = os.getenv('DATABASE_PATH', self.database_path)
-        self.max_price = int(os.getenv('MAX_PRICE', str(self.max_price)))
-        self.check_interval = int(os.getenv('CHECK_INTERVAL', str(self.check_interval)))
+        env = os.environ
+        self.telegram_bot_token = env.get('TELEGRAM_BOT_TOKEN', self.telegram_bot_token)
+        self.telegram_channel_id = env.get('TELEGRAM_CHANNEL_ID', self.telegram_channel_id)
+        self.database_path = env.get('DATABASE_PATH', self.database_path)
+
+        max_price = env.get('MAX_PRICE')
+        if max_price:
+            self.max_price = int(max_price)
+
+        check_interval = env.get('CHECK_INTERVAL')
+        if check_interval:
+            self.check_interval = int(check_interval)
 
 config = Config()
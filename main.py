@@ -1,29 +1,94 @@
 import asyncio
+import hashlib
 import logging
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 import aiohttp
-from bs4 import BeautifulSoup
+from aiolimiter import AsyncLimiter
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from selectolax.parser import HTMLParser
 import sqlite3
+import aiosqlite
 from dataclasses import dataclass
 import os
 from telegram import Bot
 import time
 import re
+import re2
 import random
-
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('apartment_monitor.log'),
-        logging.StreamHandler()
-    ]
-)
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+# Записи уходят в очередь, а файл и stdout обслуживает отдельный поток —
+# логирование не блокирует event loop
+_log_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+_file_handler = logging.FileHandler('apartment_monitor.log', delay=True)
+_file_handler.setFormatter(_log_formatter)
+_stream_handler = logging.StreamHandler()
+_stream_handler.setFormatter(_log_formatter)
+
+_log_queue = queue.SimpleQueue()
+_log_listener = QueueListener(_log_queue, _file_handler, _stream_handler)
+_log_listener.start()
+
+logging.basicConfig(level=logging.INFO, format='%(message)s', handlers=[QueueHandler(_log_queue)])
 logger = logging.getLogger(__name__)
 
 os.makedirs("data", exist_ok=True)
 
+PRICE_DIGITS_RE = re.compile(r'\d+')
+WS_RE = re.compile(r'\s+')
+
+AVITO_FALLBACK_RE = re.compile(
+    r'(?P<addr>'
+    r'Новосибирская\s+обл\.?,\s*Новосибирск,\s*[^,\n]+(?:,\s*\d+[^,\n]*)?'
+    r'|Новосибирск,\s*[^,\n]+(?:,\s*\d+[^,\n]*)?'
+    r'|г\.\s*Новосибирск,\s*[^,\n]+(?:,\s*\d+[^,\n]*)?'
+    r'|ул\.\s*[А-Яа-я\s\-]+(?:,\s*\d+[^,\n]*)?'
+    r'|пр\.\s*[А-Яа-я\s\-]+(?:,\s*\d+[^,\n]*)?'
+    r'|пер\.\s*[А-Яа-я\s\-]+(?:,\s*\d+[^,\n]*)?'
+    r'|б-р\s*[А-Яа-я\s\-]+(?:,\s*\d+[^,\n]*)?'
+    r')'
+    r'|(?P<area>\d+(?:[.,]\d+)?)\s*(?:м²|кв\.?\s*м)'
+    r'|S:\s*(?P<area_s>\d+(?:[.,]\d+)?)'
+    r'|площадь[:\s]*(?P<area_p>\d+(?:[.,]\d+)?)'
+    r'|(?P<rooms>\d+)(?:\s*комн|-?к)',
+    re.IGNORECASE
+)
+
+AREA_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in (
+    r'(\d+(?:[.,]\d+)?)\s*м²',
+    r'(\d+(?:[.,]\d+)?)\s*кв\.?\s*м',
+    r'S:\s*(\d+(?:[.,]\d+)?)',
+    r'площадь[:\s]*(\d+(?:[.,]\d+)?)'
+))
+
+# Текст приводится к нижнему регистру один раз, поэтому флаг IGNORECASE не нужен
+ROOM_PATTERNS = tuple(re.compile(p) for p in (
+    r'(\d+)-комн',
+    r'(\d+)\s*комн',
+    r'(\d+)-к',
+    r'(\d+)к'
+))
+
+_CIAN_ADDRESS_PATTERN_STRS = (
+    r'Новосибирская\s+область,\s*Новосибирск,\s*[^,\n]+(?:,\s*метро\s*[^,\n]+\s*\d+\s*м)?',
+    r'Новосибирск,\s*[^,\n]+(?:,\s*метро\s*[^,\n]+)?',
+    r'г\.\s*Новосибирск,\s*[^,\n]+(?:,\s*метро\s*[^,\n]+)?',
+    r'ул\.\s*[А-Яа-я\s\-]+(?:,\s*\d+[^,\n]*)?(?:,\s*метро\s*[^,\n]+)?',
+    r'пр\.\s*[А-Яа-я\s\-]+(?:,\s*\d+[^,\n]*)?(?:,\s*метро\s*[^,\n]+)?'
+)
+
+CIAN_ADDRESS_PATTERNS = tuple(re.compile(p) for p in _CIAN_ADDRESS_PATTERN_STRS)
+
+# Один DFA-проход по тексту вместо пяти последовательных backtracking-поисков
+CIAN_ADDRESS_SET = re2.Set.SearchSet()
+for _pattern in _CIAN_ADDRESS_PATTERN_STRS:
+    CIAN_ADDRESS_SET.Add(_pattern)
+CIAN_ADDRESS_SET.Compile()
+
+M2_RE = re.compile(r'(\d+(?:,\d+)?)\s*м²')
+
 
 def fix_database_if_needed(db_path: str):
     """Исправление базы данных при необходимости"""
@@ -86,7 +151,7 @@ def fix_database_if_needed(db_path: str):
         logger.error(f"Ошибка при исправлении БД: {e}")
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Apartment:
     id: str
     title: str
@@ -104,268 +169,327 @@ class Database:
         self.db_path = db_path
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
         fix_database_if_needed(self.db_path)
-        self.init_db()
 
-    def init_db(self):
+        self.conn: Optional[aiosqlite.Connection] = None
+        self._conn_lock = asyncio.Lock()
+        self.max_retries = 5
+
+    async def _get_conn(self) -> aiosqlite.Connection:
+        """Ленивое открытие соединения: запросы уходят в выделенный поток aiosqlite"""
+        if self.conn is None:
+            async with self._conn_lock:
+                if self.conn is None:
+                    conn = await aiosqlite.connect(self.db_path, timeout=30.0, isolation_level=None)
+                    conn.row_factory = sqlite3.Row
+
+                    await conn.execute("PRAGMA journal_mode=WAL")
+                    await conn.execute("PRAGMA synchronous=NORMAL")
+                    await conn.execute("PRAGMA busy_timeout=30000")
+                    await conn.execute("PRAGMA cache_size=-20000")
+                    await conn.execute("PRAGMA temp_store=MEMORY")
+                    await conn.execute("PRAGMA mmap_size=268435456")
+                    await conn.execute("PRAGMA wal_autocheckpoint=1000")
+
+                    await self._init_db(conn)
+                    self.conn = conn
+        return self.conn
+
+    async def init(self):
+        """Явное открытие соединения и создание схемы при старте"""
+        await self._get_conn()
+
+    async def _init_db(self, conn: aiosqlite.Connection):
         """Инициализация базы данных"""
         try:
-            conn = sqlite3.connect(self.db_path, timeout=30.0)
-            cursor = conn.cursor()
+            await conn.execute('''
+                               CREATE TABLE IF NOT EXISTS apartments
+                               (
+                                   id          INTEGER PRIMARY KEY AUTOINCREMENT,
+                                   external_id TEXT UNIQUE NOT NULL,
+                                   title       TEXT        NOT NULL,
+                                   price       INTEGER     NOT NULL,
+                                   url         TEXT        NOT NULL,
+                                   location    TEXT,
+                                   rooms       INTEGER,
+                                   area        TEXT,
+                                   source      TEXT        NOT NULL,
+                                   created_at  TEXT    DEFAULT (datetime('now')),
+                                   notified    INTEGER DEFAULT 0
+                               )
+                               ''')
 
-            cursor.execute("PRAGMA journal_mode=WAL")
-            cursor.execute("PRAGMA synchronous=NORMAL")
-            cursor.execute("PRAGMA cache_size=1000")
-            cursor.execute("PRAGMA temp_store=memory")
+            await conn.execute('CREATE INDEX IF NOT EXISTS idx_price ON apartments(price)')
+            await conn.execute('CREATE INDEX IF NOT EXISTS idx_source ON apartments(source)')
+            await conn.execute('DROP INDEX IF EXISTS idx_notified')
+            await conn.execute('CREATE INDEX IF NOT EXISTS idx_notified_created ON apartments(notified, created_at DESC)')
+            await conn.execute('CREATE INDEX IF NOT EXISTS idx_location ON apartments(location)')
 
-            cursor.execute('''
-                           CREATE TABLE IF NOT EXISTS apartments
-                           (
-                               id
-                               INTEGER
-                               PRIMARY
-                               KEY
-                               AUTOINCREMENT,
-                               external_id
-                               TEXT
-                               UNIQUE
-                               NOT
-                               NULL,
-                               title
-                               TEXT
-                               NOT
-                               NULL,
-                               price
-                               INTEGER
-                               NOT
-                               NULL,
-                               url
-                               TEXT
-                               NOT
-                               NULL,
-                               location
-                               TEXT,
-                               rooms
-                               INTEGER,
-                               area
-                               TEXT,
-                               source
-                               TEXT
-                               NOT
-                               NULL,
-                               created_at
-                               TEXT
-                               DEFAULT (
-                               datetime
-                           (
-                               'now'
-                           )),
-                               notified INTEGER DEFAULT 0
-                               )
-                           ''')
+            try:
+                await conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS uq_url ON apartments(url)')
+                await conn.execute('DROP INDEX IF EXISTS uq_location')
+                await conn.execute('''
+                                   CREATE UNIQUE INDEX IF NOT EXISTS uq_location_strict
+                                       ON apartments(location)
+                                       WHERE location NOT IN ('Не указано', 'Новосибирск')
+                                   ''')
+            except sqlite3.OperationalError as e:
+                logger.warning(f"Не удалось создать уникальные индексы (есть дубликаты?): {e}")
 
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_price ON apartments(price)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_source ON apartments(source)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_notified ON apartments(notified)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_location ON apartments(location)')
+            await conn.execute('ANALYZE')
 
-            conn.commit()
-            conn.close()
+            await conn.commit()
             logger.info("База данных инициализирована успешно")
         except Exception as e:
             logger.error(f"Ошибка инициализации БД: {e}")
 
-    def apartment_exists(self, external_id: str) -> bool:
-        """Проверка существования квартиры в БД"""
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                conn = sqlite3.connect(self.db_path, timeout=60.0)
-                conn.execute("PRAGMA busy_timeout = 30000")
-                cursor = conn.cursor()
-                cursor.execute("SELECT 1 FROM apartments WHERE external_id = ? LIMIT 1", (str(external_id),))
-                exists = cursor.fetchone() is not None
-                conn.close()
-                return exists
-            except sqlite3.OperationalError as e:
-                if "database is locked" in str(e) and attempt < max_retries - 1:
-                    logger.warning(
-                        f"База заблокирована при проверке существования, попытка {attempt + 1}/{max_retries}")
-                    time.sleep(1)
-                    continue
-                else:
-                    logger.error(f"Ошибка проверки существования квартиры {external_id}: {e}")
-                    return True
-            except Exception as e:
-                logger.error(f"Ошибка проверки существования квартиры {external_id}: {e}")
-                return True
-
-        return True
+    async def close(self):
+        """Закрытие соединения с базой данных"""
+        if self.conn is not None:
+            await self.conn.close()
+            self.conn = None
 
-    def location_exists(self, location: str) -> bool:
-        """Проверка существования квартиры с такой же локацией в БД"""
-        max_retries = 3
-        for attempt in range(max_retries):
+    async def _run_with_retries(self, func, *args):
+        """Выполнение запроса с экспоненциальным backoff при блокировке базы"""
+        for attempt in range(self.max_retries):
             try:
-                conn = sqlite3.connect(self.db_path, timeout=60.0)
-                conn.execute("PRAGMA busy_timeout = 30000")
-                cursor = conn.cursor()
-                cursor.execute("SELECT 1 FROM apartments WHERE location = ? LIMIT 1", (str(location),))
-                exists = cursor.fetchone() is not None
-                conn.close()
-                return exists
+                return await func(*args)
             except sqlite3.OperationalError as e:
-                if "database is locked" in str(e) and attempt < max_retries - 1:
-                    logger.warning(f"База заблокирована при проверке локации, попытка {attempt + 1}/{max_retries}")
-                    time.sleep(1)
+                if "database is locked" in str(e) and attempt < self.max_retries - 1:
+                    delay = 0.05 * (2 ** attempt) + random.random() * 0.05
+                    logger.warning(
+                        f"База заблокирована, повтор через {delay:.2f} с (попытка {attempt + 1}/{self.max_retries})")
+                    await asyncio.sleep(delay)
                     continue
-                else:
-                    logger.error(f"Ошибка проверки существования локации {location}: {e}")
-                    return True
-            except Exception as e:
-                logger.error(f"Ошибка проверки существования локации {location}: {e}")
-                return True
+                raise
 
-        return True
+    async def _apartment_exists(self, external_id: str) -> bool:
+        conn = await self._get_conn()
+        async with conn.execute("SELECT 1 FROM apartments WHERE external_id = ? LIMIT 1",
+                                (str(external_id),)) as cursor:
+            return await cursor.fetchone() is not None
 
-    def add_apartment(self, apartment: Apartment) -> bool:
-        """Добавление новой квартиры в БД"""
-        max_retries = 3
+    async def apartment_exists(self, external_id: str) -> bool:
+        """Проверка существования квартиры в БД"""
+        try:
+            return await self._run_with_retries(self._apartment_exists, external_id)
+        except Exception as e:
+            logger.error(f"Ошибка проверки существования квартиры {external_id}: {e}")
+            return True
+
+    async def _add_apartment(self, apartment: Apartment) -> bool:
+        conn = await self._get_conn()
+        cursor = await conn.execute('''
+                                    INSERT OR IGNORE INTO apartments (external_id, title, price, url, location,
+                                                                      rooms, area, source, created_at, notified)
+                                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                                    ''', (
+                                        apartment.id,
+                                        apartment.title,
+                                        apartment.price,
+                                        apartment.url,
+                                        apartment.location,
+                                        apartment.rooms,
+                                        apartment.area,
+                                        apartment.source,
+                                        apartment.created_at,
+                                        0
+                                    ))
+        return cursor.rowcount == 1
+
+    async def add_apartment(self, apartment: Apartment) -> bool:
+        """Добавление новой квартиры в БД; дубликаты отсекаются уникальными индексами"""
+        try:
+            added = await self._run_with_retries(self._add_apartment, apartment)
+        except Exception as e:
+            logger.error(f"Ошибка добавления квартиры {apartment.id}: {e}")
+            return False
 
-        if self.apartment_exists(apartment.id):
+        if not added:
             logger.debug(f"Квартира {apartment.id} уже существует")
             return False
 
-        if self.location_exists(apartment.location):
-            logger.debug(f"Квартира с локацией '{apartment.location}' уже существует")
-            return False
+        logger.info(
+            f"Добавлена новая квартира: {apartment.title[:50]}... - {apartment.price} ₽ - {apartment.area} - {apartment.location[:30]}...")
+        return True
 
+    async def _add_apartments_bulk(self, rows) -> int:
+        conn = await self._get_conn()
+        before = conn.total_changes
+        await conn.execute("BEGIN IMMEDIATE")
         try:
-            conn = sqlite3.connect(self.db_path, timeout=60.0)
-            cursor = conn.cursor()
-            cursor.execute("SELECT 1 FROM apartments WHERE url = ? LIMIT 1", (str(apartment.url),))
-            if cursor.fetchone():
-                conn.close()
-                logger.debug(f"Квартира с URL {apartment.url} уже существует")
-                return False
-            conn.close()
-        except Exception as e:
-            logger.error(f"Ошибка проверки дубликата по URL: {e}")
-            return False
-
-        for attempt in range(max_retries):
-            try:
-                conn = sqlite3.connect(self.db_path, timeout=60.0)
-                conn.execute("PRAGMA busy_timeout = 30000")
-                cursor = conn.cursor()
-
-                cursor.execute('''
-                               INSERT INTO apartments (external_id, title, price, url, location, rooms, area, source,
-                                                       created_at, notified)
-                               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                               ''', (
-                                   str(apartment.id),
-                                   str(apartment.title),
-                                   int(apartment.price),
-                                   str(apartment.url),
-                                   str(apartment.location),
-                                   int(apartment.rooms),
-                                   str(apartment.area),
-                                   str(apartment.source),
-                                   str(apartment.created_at),
-                                   0
-                               ))
-                conn.commit()
-                conn.close()
-                logger.info(
-                    f"Добавлена новая квартира: {apartment.title[:50]}... - {apartment.price} ₽ - {apartment.area} - {apartment.location[:30]}...")
-                return True
-            except sqlite3.IntegrityError as e:
-                logger.debug(f"Квартира {apartment.id} уже существует (IntegrityError)")
-                return False
-            except sqlite3.OperationalError as e:
-                if "database is locked" in str(e) and attempt < max_retries - 1:
-                    logger.warning(f"База заблокирована, попытка {attempt + 1}/{max_retries}")
-                    time.sleep(1)
-                    continue
-                else:
-                    logger.error(f"Ошибка БД для квартиры {apartment.id}: {e}")
-                    return False
-            except Exception as e:
-                logger.error(f"Ошибка добавления квартиры {apartment.id}: {e}")
-                return False
+            await conn.executemany('''
+                                   INSERT OR IGNORE INTO apartments (external_id, title, price, url, location,
+                                                                     rooms, area, source, created_at, notified)
+                                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                                   ''', rows)
+            await conn.commit()
+        except Exception:
+            await conn.rollback()
+            raise
+        return conn.total_changes - before
+
+    async def add_apartments_bulk(self, apartments: List[Apartment]) -> int:
+        """Добавление пачки квартир одной транзакцией, возвращает число новых"""
+        if not apartments:
+            return 0
+
+        rows = [(
+            a.id,
+            a.title,
+            a.price,
+            a.url,
+            a.location,
+            a.rooms,
+            a.area,
+            a.source,
+            a.created_at,
+            0
+        ) for a in apartments]
 
-        return False
-
-    def get_new_apartments(self) -> List[Dict[str, Any]]:
+        try:
+            return await self._run_with_retries(self._add_apartments_bulk, rows)
+        except Exception as e:
+            logger.error(f"Ошибка пакетного добавления квартир: {e}")
+            return 0
+
+    async def _get_new_apartments(self):
+        conn = await self._get_conn()
+        async with conn.execute('''
+                                SELECT id,
+                                       external_id,
+                                       title,
+                                       price,
+                                       url,
+                                       location,
+                                       rooms,
+                                       area,
+                                       source,
+                                       created_at
+                                FROM apartments
+                                WHERE notified = 0
+                                ORDER BY created_at DESC
+                                ''') as cursor:
+            return await cursor.fetchall()
+
+    async def get_new_apartments(self) -> List[Dict[str, Any]]:
         """Получение новых квартир для уведомления"""
         try:
-            conn = sqlite3.connect(self.db_path, timeout=60.0)
-            conn.execute("PRAGMA busy_timeout = 30000")
-            cursor = conn.cursor()
-            cursor.execute('''
-                           SELECT id,
-                                  external_id,
-                                  title,
-                                  price,
-                                  url,
-                                  location,
-                                  rooms,
-                                  area,
-                                  source,
-                                  created_at
-                           FROM apartments
-                           WHERE notified = 0
-                           ORDER BY created_at DESC
-                           ''')
-            apartments = []
-            for row in cursor.fetchall():
-                apartments.append({
-                    'id': int(row[0]),
-                    'external_id': str(row[1]),
-                    'title': str(row[2]),
-                    'price': int(row[3]),
-                    'url': str(row[4]),
-                    'location': str(row[5]),
-                    'rooms': int(row[6]),
-                    'area': str(row[7]),
-                    'source': str(row[8]),
-                    'created_at': str(row[9])
-                })
-            conn.close()
-            return apartments
+            rows = await self._run_with_retries(self._get_new_apartments)
+            return [dict(row) for row in rows]
+        except Exception as e:
+            logger.error(f"Ошибка получения новых квартир: {e}")
+            return []
+
+    async def _claim_new_apartments(self, limit: int):
+        conn = await self._get_conn()
+        await conn.execute("BEGIN IMMEDIATE")
+        try:
+            async with conn.execute('''
+                                    UPDATE apartments
+                                    SET notified = 1
+                                    WHERE id IN (SELECT id
+                                                 FROM apartments
+                                                 WHERE notified = 0
+                                                 ORDER BY created_at DESC
+                                                 LIMIT ?)
+                                    RETURNING id, external_id, title, price, url, location,
+                                        rooms, area, source, created_at
+                                    ''', (limit,)) as cursor:
+                rows = await cursor.fetchall()
+            await conn.commit()
+        except Exception:
+            await conn.rollback()
+            raise
+        return rows
+
+    async def claim_new_apartments(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Атомарно забрать пачку новых квартир, сразу помечая их уведомленными"""
+        try:
+            rows = await self._run_with_retries(self._claim_new_apartments, limit)
+            return [dict(row) for row in rows]
         except Exception as e:
             logger.error(f"Ошибка получения новых квартир: {e}")
             return []
 
-    def mark_as_notified(self, apartment_id: int):
+    async def _requeue_apartments(self, ids):
+        conn = await self._get_conn()
+        placeholders = ",".join("?" * len(ids))
+        await conn.execute(f"UPDATE apartments SET notified = 0 WHERE id IN ({placeholders})",
+                           [int(i) for i in ids])
+
+    async def requeue_apartments(self, ids: List[int]):
+        """Вернуть квартиры в очередь уведомлений после неудачной отправки"""
+        if not ids:
+            return
+        try:
+            await self._run_with_retries(self._requeue_apartments, ids)
+        except Exception as e:
+            logger.error(f"Ошибка возврата квартир в очередь уведомлений: {e}")
+
+    async def _mark_as_notified(self, apartment_id: int):
+        conn = await self._get_conn()
+        await conn.execute("UPDATE apartments SET notified = 1 WHERE id = ?", (int(apartment_id),))
+
+    async def mark_as_notified(self, apartment_id: int):
         """Отметить квартиру как уведомленную"""
         try:
-            conn = sqlite3.connect(self.db_path, timeout=60.0)
-            conn.execute("PRAGMA busy_timeout = 30000")
-            cursor = conn.cursor()
-            cursor.execute("UPDATE apartments SET notified = 1 WHERE id = ?", (int(apartment_id),))
-            conn.commit()
-            conn.close()
+            await self._run_with_retries(self._mark_as_notified, apartment_id)
         except Exception as e:
             logger.error(f"Ошибка отметки уведомления для {apartment_id}: {e}")
 
+    async def _mark_as_notified_bulk(self, ids):
+        conn = await self._get_conn()
+        placeholders = ",".join("?" * len(ids))
+        await conn.execute("BEGIN")
+        try:
+            await conn.execute(f"UPDATE apartments SET notified = 1 WHERE id IN ({placeholders})",
+                               [int(i) for i in ids])
+            await conn.commit()
+        except Exception:
+            await conn.rollback()
+            raise
+
+    async def mark_as_notified_bulk(self, ids: List[int]):
+        """Отметить пачку квартир как уведомленные одной транзакцией"""
+        if not ids:
+            return
+        try:
+            await self._run_with_retries(self._mark_as_notified_bulk, ids)
+        except Exception as e:
+            logger.error(f"Ошибка пакетной отметки уведомлений: {e}")
+
 
 class AvitoParser:
+    ITEM_SELECTORS = (
+        '[data-marker="item"]',
+        '.items-item',
+        '.iva-item-root'
+    )
+
+    LOCATION_SELECTORS = (
+        '[data-marker="item-address"]',
+        '.item-address-georeferences-item__content',
+        '.style-item-address-georeferences-item-TZsrp',
+        '.geo-georeferences-item__content',
+        '.item-address'
+    )
+
+    AREA_SELECTORS = (
+        '[data-marker="item-specific-params"]',
+        '.item-params',
+        '.params-paramsList',
+        '.iva-item-text'
+    )
+
     def __init__(self):
         self.base_url = "https://www.avito.ru"
         self.last_request_time = 0
         self.min_delay = 15
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._sem = asyncio.Semaphore(4)
+        self._rate_lock = asyncio.Lock()
 
-    def get_random_headers(self):
-        """Получение случайных заголовков"""
-        user_agents = [
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-        ]
-
-        return {
-            'User-Agent': random.choice(user_agents),
+        base_headers = {
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
             'Accept-Language': 'ru-RU,ru;q=0.8,en-US;q=0.5,en;q=0.3',
             'Accept-Encoding': 'gzip, deflate',
@@ -374,23 +498,46 @@ class AvitoParser:
             'Cache-Control': 'no-cache',
             'Pragma': 'no-cache'
         }
+        user_agents = [
+            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+            'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+        ]
+        self._header_choices = [{**base_headers, 'User-Agent': ua} for ua in user_agents]
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Ленивое создание общей HTTP-сессии с пулом соединений"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit_per_host=4, keepalive_timeout=60, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=60))
+        return self._session
+
+    async def close(self):
+        """Закрытие HTTP-сессии"""
+        if self._session and not self._session.closed:
+            await self._session.close()
+
+    def get_random_headers(self):
+        """Получение случайных заголовков из заранее собранных вариантов"""
+        return random.choice(self._header_choices)
 
     async def respect_rate_limit(self):
         """Соблюдение лимитов запросов"""
-        current_time = time.time()
-        time_since_last = current_time - self.last_request_time
+        async with self._rate_lock:
+            current_time = time.time()
+            time_since_last = current_time - self.last_request_time
 
-        if time_since_last < self.min_delay:
-            sleep_time = self.min_delay - time_since_last + random.uniform(5, 10)
-            logger.info(f"Ожидание {sleep_time:.1f} секунд для соблюдения rate limit Avito...")
-            await asyncio.sleep(sleep_time)
+            if time_since_last < self.min_delay:
+                sleep_time = self.min_delay - time_since_last + random.uniform(5, 10)
+                logger.info(f"Ожидание {sleep_time:.1f} секунд для соблюдения rate limit Avito...")
+                await asyncio.sleep(sleep_time)
 
-        self.last_request_time = time.time()
+            self.last_request_time = time.time()
 
     def extract_price(self, price_text: str) -> Optional[int]:
         """Извлечение цены из текста"""
         try:
-            numbers = re.findall(r'\d+', price_text.replace(' ', ''))
+            numbers = PRICE_DIGITS_RE.findall(price_text.replace(' ', ''))
             if numbers:
                 price = int(''.join(numbers))
                 if 0 <= price <= 200000:
@@ -399,6 +546,19 @@ class AvitoParser:
         except:
             return None
 
+    def _scan_item_text(self, text: str):
+        """Один проход комбинированного регулярного выражения по тексту объявления"""
+        addresses, areas, rooms = [], [], []
+        for m in AVITO_FALLBACK_RE.finditer(text):
+            group = m.lastgroup
+            if group == 'addr':
+                addresses.append(m.group('addr'))
+            elif group in ('area', 'area_s', 'area_p'):
+                areas.append(m.group(group))
+            elif group == 'rooms':
+                rooms.append(m.group('rooms'))
+        return addresses, areas, rooms
+
     async def parse_apartments(self, url: str, max_price: int = 30000) -> List[Apartment]:
         """Парсинг квартир с Avito"""
         apartments = []
@@ -409,11 +569,11 @@ class AvitoParser:
             await self.respect_rate_limit()
 
             headers = self.get_random_headers()
-            timeout = aiohttp.ClientTimeout(total=60)
+            session = self._get_session()
 
-            async with aiohttp.ClientSession(headers=headers, timeout=timeout) as session:
-                try:
-                    async with session.get(url) as response:
+            try:
+                async with self._sem:
+                    async with session.get(url, headers=headers) as response:
                         if response.status == 429:
                             logger.warning("Получен код 429 от Avito. Пропускаем этот цикл...")
                             return apartments
@@ -424,204 +584,162 @@ class AvitoParser:
                             logger.error(f"Ошибка HTTP при запросе к Avito: {response.status}")
                             return apartments
 
-                        html = await response.text()
-                        logger.info(f"Получен HTML размером {len(html)} символов")
+                        html_bytes = await response.read()
+                        logger.info(f"Получен HTML размером {len(html_bytes)} байт")
 
-                except Exception as e:
-                    logger.error(f"Ошибка при запросе к Avito: {e}")
-                    return apartments
-
-                soup = BeautifulSoup(html, 'html.parser')
-
-                selectors = [
-                    '[data-marker="item"]',
-                    '.items-item',
-                    '.iva-item-root'
-                ]
-
-                items = []
-                for selector in selectors:
-                    items = soup.select(selector)
-                    if items:
-                        logger.info(f"Найдено {len(items)} элементов с селектором: {selector}")
-                        break
-
-                if not items:
-                    logger.warning("Не найдено объявлений с известными селекторами на Avito")
-                    return apartments
-
-                for i, item in enumerate(items[:10]):
-                    try:
-                        title_elem = item.select_one('[data-marker="item-title"]')
-                        if not title_elem:
-                            title_elem = item.select_one('h3 a')
-                        if not title_elem:
-                            title_elem = item.select_one('a[href*="/kvartiry/"]')
-
-                        if not title_elem:
-                            continue
+            except Exception as e:
+                logger.error(f"Ошибка при запросе к Avito: {e}")
+                return apartments
 
-                        title = title_elem.get_text(strip=True)
-                        link_url = title_elem.get('href', '')
+            return await asyncio.to_thread(self._parse_html_sync, html_bytes, max_price)
 
-                        if not title or not link_url:
-                            continue
+        except Exception as e:
+            logger.error(f"Ошибка при парсинге Avito: {e}")
+            return apartments
 
-                        price_elem = item.select_one('[data-marker="item-price"]')
-                        if not price_elem:
-                            price_elem = item.select_one('.price-text')
+    def _parse_html_sync(self, html_bytes: bytes, max_price: int) -> List[Apartment]:
+        """Синхронный разбор списка объявлений; выполняется в отдельном потоке"""
+        apartments = []
 
-                        if not price_elem:
-                            continue
+        try:
+            tree = HTMLParser(html_bytes)
 
-                        price_text = price_elem.get_text(strip=True)
-                        price = self.extract_price(price_text)
+            items = []
+            for selector in self.ITEM_SELECTORS:
+                items = tree.css(selector)
+                if items:
+                    logger.info(f"Найдено {len(items)} элементов с селектором: {selector}")
+                    break
 
-                        if price is None or price > max_price:
-                            continue
+            if not items:
+                logger.warning("Не найдено объявлений с известными селекторами на Avito")
+                return apartments
+
+            for i, item in enumerate(items[:10]):
+                try:
+                    title_elem = item.css_first('[data-marker="item-title"]')
+                    if not title_elem:
+                        title_elem = item.css_first('h3 a')
+                    if not title_elem:
+                        title_elem = item.css_first('a[href*="/kvartiry/"]')
+
+                    if not title_elem:
+                        continue
+
+                    title = title_elem.text(strip=True)
+                    link_url = title_elem.attributes.get('href') or ''
+
+                    if not title or not link_url:
+                        continue
+
+                    price_elem = item.css_first('[data-marker="item-price"]')
+                    if not price_elem:
+                        price_elem = item.css_first('.price-text')
+
+                    if not price_elem:
+                        continue
+
+                    price_text = price_elem.text(strip=True)
+                    price = self.extract_price(price_text)
+
+                    if price is None or price > max_price:
+                        continue
 
-                        if link_url.startswith('/'):
-                            full_url = self.base_url + link_url
-                        else:
-                            full_url = link_url
-
-                        apartment_id = f"avito_{abs(hash(full_url)) % 1000000}"
-
-                        location = "Не указано"
-
-                        location_selectors = [
-                            '[data-marker="item-address"]',
-                            '.item-address-georeferences-item__content',
-                            '.style-item-address-georeferences-item-TZsrp',
-                            '.geo-georeferences-item__content',
-                            '.item-address'
-                        ]
-
-                        location_parts = []
-
-                        for selector in location_selectors:
-                            location_elem = item.select_one(selector)
-                            if location_elem:
-                                location_text = location_elem.get_text(strip=True)
-                                if location_text and len(location_text) > 5:
-                                    location_parts.append(location_text)
-
-                        if not location_parts:
-                            all_text = item.get_text()
-                            address_patterns = [
-                                r'Новосибирская\s+обл\.?,\s*Новосибирск,\s*[^,\n]+(?:,\s*\d+[^,\n]*)?',
-                                r'Новосибирск,\s*[^,\n]+(?:,\s*\d+[^,\n]*)?',
-                                r'г\.\s*Новосибирск,\s*[^,\n]+(?:,\s*\d+[^,\n]*)?',
-                                r'ул\.\s*[А-Яа-я\s\-]+(?:,\s*\d+[^,\n]*)?',
-                                r'пр\.\s*[А-Яа-я\s\-]+(?:,\s*\d+[^,\n]*)?',
-                                r'пер\.\s*[А-Яа-я\s\-]+(?:,\s*\d+[^,\n]*)?',
-                                r'б-р\s*[А-Яа-я\s\-]+(?:,\s*\d+[^,\n]*)?'
-                            ]
-
-                            for pattern in address_patterns:
-                                matches = re.findall(pattern, all_text)
-                                if matches:
-                                    location_parts.extend(matches[:2])
+                    if link_url.startswith('/'):
+                        full_url = self.base_url + link_url
+                    else:
+                        full_url = link_url
+
+                    real_id = item.attributes.get('data-item-id')
+                    if real_id:
+                        apartment_id = f"avito_{real_id}"
+                    else:
+                        apartment_id = 'avito_' + hashlib.blake2b(full_url.encode(), digest_size=6).hexdigest()
+
+                    item_text = item.text(separator=' ', strip=True)
+                    title_and_text = f"{title} {item_text}"
+                    addr_matches, area_matches, room_matches = self._scan_item_text(title_and_text)
+
+                    location = "Не указано"
+
+                    location_parts = []
+
+                    for selector in self.LOCATION_SELECTORS:
+                        location_elem = item.css_first(selector)
+                        if location_elem:
+                            location_text = location_elem.text(strip=True)
+                            if location_text and len(location_text) > 5:
+                                location_parts.append(location_text)
+
+                    if not location_parts:
+                        location_parts.extend(addr_matches[:2])
+
+                    if location_parts:
+                        location = max(location_parts, key=len)
+                        location = WS_RE.sub(' ', location).strip()
+                        if len(location) > 100:
+                            location = location[:97] + "..."
+                    else:
+                        location = "Новосибирск"
+
+                    area = "Не указано"
+
+                    for selector in self.AREA_SELECTORS:
+                        area_elem = item.css_first(selector)
+                        if area_elem:
+                            area_text = area_elem.text(strip=True)
+                            for pattern in AREA_PATTERNS:
+                                area_match = pattern.search(area_text)
+                                if area_match:
+                                    area = f"{area_match.group(1)} м²"
                                     break
 
-                        if location_parts:
-                            location = max(location_parts, key=len)
-                            location = re.sub(r'\s+', ' ', location).strip()
-                            if len(location) > 100:
-                                location = location[:97] + "..."
-                        else:
-                            location = "Новосибирск"
-
-                        area = "Не указано"
-
-                        area_selectors = [
-                            '[data-marker="item-specific-params"]',
-                            '.item-params',
-                            '.params-paramsList',
-                            '.iva-item-text'
-                        ]
-
-                        for selector in area_selectors:
-                            area_elem = item.select_one(selector)
-                            if area_elem:
-                                area_text = area_elem.get_text(strip=True)
-                                area_patterns = [
-                                    r'(\d+(?:[.,]\d+)?)\s*м²',
-                                    r'(\d+(?:[.,]\d+)?)\s*кв\.?\s*м',
-                                    r'S:\s*(\d+(?:[.,]\d+)?)',
-                                    r'площадь[:\s]*(\d+(?:[.,]\d+)?)'
-                                ]
-
-                                for pattern in area_patterns:
-                                    area_match = re.search(pattern, area_text, re.IGNORECASE)
-                                    if area_match:
-                                        area = f"{area_match.group(1)} м²"
-                                        break
-
-                                if area != "Не указано":
+                            if area != "Не указано":
+                                break
+
+                    if area == "Не указано":
+                        for match in area_matches:
+                            try:
+                                area_value = float(match.replace(',', '.'))
+                                if 10 <= area_value <= 500:
+                                    area = f"{match} м²"
                                     break
+                            except:
+                                continue
+
+                    rooms = 1
+                    for match in room_matches:
+                        try:
+                            value = int(match)
+                            if 1 <= value <= 10:
+                                rooms = value
+                                break
+                        except:
+                            continue
 
-                        if area == "Не указано":
-                            item_text = item.get_text()
-                            area_patterns = [
-                                r'(\d+(?:[.,]\d+)?)\s*м²',
-                                r'(\d+(?:[.,]\d+)?)\s*кв\.?\s*м',
-                                r'S:\s*(\d+(?:[.,]\d+)?)',
-                                r'площадь[:\s]*(\d+(?:[.,]\d+)?)'
-                            ]
-
-                            for pattern in area_patterns:
-                                area_matches = re.findall(pattern, item_text, re.IGNORECASE)
-                                if area_matches:
-                                    for match in area_matches:
-                                        try:
-                                            area_value = float(match.replace(',', '.'))
-                                            if 10 <= area_value <= 500:
-                                                area = f"{match} м²"
-                                                break
-                                        except:
-                                            continue
-                                    if area != "Не указано":
-                                        break
-
-                        rooms = 1
-                        room_patterns = [
-                            r'(\d+)-комн',
-                            r'(\d+)\s*комн',
-                            r'(\d+)-к',
-                            r'(\d+)к'
-                        ]
-
-                        title_and_text = f"{title} {item.get_text()}"
-                        for pattern in room_patterns:
-                            room_match = re.search(pattern, title_and_text, re.IGNORECASE)
-                            if room_match:
-                                try:
-                                    rooms = int(room_match.group(1))
-                                    if 1 <= rooms <= 10:
-                                        break
-                                except:
-                                    continue
-
-                        apartment = Apartment(
-                            id=apartment_id,
-                            title=title[:200],
-                            price=price,
-                            url=full_url,
-                            location=location[:100],
-                            rooms=rooms,
-                            area=area[:50],
-                            source="Avito",
-                            created_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                        )
-
-                        apartments.append(apartment)
-                        logger.info(f"Найдена квартира: {title[:50]}... - {price} ₽")
-
-                    except Exception as e:
-                        logger.error(f"Ошибка при обработке элемента Avito {i + 1}: {e}")
+                    if not location_parts and area == "Не указано" and not room_matches:
+                        logger.debug(f"Элемент Avito {i + 1} не похож на карточку объявления, пропускаем")
                         continue
 
+                    apartment = Apartment(
+                        id=apartment_id,
+                        title=title[:200],
+                        price=price,
+                        url=full_url,
+                        location=location[:100],
+                        rooms=rooms,
+                        area=area[:50],
+                        source="Avito",
+                        created_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                    )
+
+                    apartments.append(apartment)
+                    logger.info(f"Найдена квартира: {title[:50]}... - {price} ₽")
+
+                except (AttributeError, ValueError, KeyError) as e:
+                    logger.debug(f"Ошибка при обработке элемента Avito {i + 1}: {e}")
+                    continue
+
         except Exception as e:
             logger.error(f"Ошибка при парсинге Avito: {e}")
 
@@ -630,40 +748,72 @@ class AvitoParser:
 
 
 class CianParser:
+    ADDRESS_SELECTORS = (
+        '[data-name="GeoLabel"]',
+        '[data-mark="GeoLabel"]',
+        '.a10a3f92e9--address--SMU25',
+        '.a10a3f92e9--geo--RNXJ5',
+        '[data-name="AddressContainer"]'
+    )
+
+    AREA_SELECTORS = (
+        '[data-mark*="Area"]',
+        '.a10a3f92e9--area--3xKvp',
+        '[title*="м²"]',
+        '[data-testid*="area"]'
+    )
+
     def __init__(self):
         self.base_url = "https://novosibirsk.cian.ru"
         self.last_request_time = 0
         self.min_delay = 5
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._sem = asyncio.Semaphore(4)
+        self._rate_lock = asyncio.Lock()
 
-    def get_random_headers(self):
-        """Получение случайных заголовков"""
+        base_headers = {
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+            'Accept-Language': 'ru-RU,ru;q=0.8,en-US;q=0.5,en;q=0.3',
+            'Connection': 'keep-alive',
+        }
         user_agents = [
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
         ]
+        self._header_choices = [{**base_headers, 'User-Agent': ua} for ua in user_agents]
 
-        return {
-            'User-Agent': random.choice(user_agents),
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'ru-RU,ru;q=0.8,en-US;q=0.5,en;q=0.3',
-            'Connection': 'keep-alive',
-        }
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Ленивое создание общей HTTP-сессии с пулом соединений"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit_per_host=4, keepalive_timeout=60, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=45))
+        return self._session
+
+    async def close(self):
+        """Закрытие HTTP-сессии"""
+        if self._session and not self._session.closed:
+            await self._session.close()
+
+    def get_random_headers(self):
+        """Получение случайных заголовков из заранее собранных вариантов"""
+        return random.choice(self._header_choices)
 
     async def respect_rate_limit(self):
         """Соблюдение лимитов запросов"""
-        current_time = time.time()
-        time_since_last = current_time - self.last_request_time
+        async with self._rate_lock:
+            current_time = time.time()
+            time_since_last = current_time - self.last_request_time
 
-        if time_since_last < self.min_delay:
-            sleep_time = self.min_delay - time_since_last + random.uniform(1, 3)
-            await asyncio.sleep(sleep_time)
+            if time_since_last < self.min_delay:
+                sleep_time = self.min_delay - time_since_last + random.uniform(1, 3)
+                await asyncio.sleep(sleep_time)
 
-        self.last_request_time = time.time()
+            self.last_request_time = time.time()
 
     def extract_price(self, price_text: str) -> Optional[int]:
         """Извлечение цены из текста"""
         try:
-            numbers = re.findall(r'\d+', price_text.replace(' ', ''))
+            numbers = PRICE_DIGITS_RE.findall(price_text.replace(' ', ''))
             if numbers:
                 price = int(''.join(numbers))
                 if 0 <= price <= 200000:
@@ -682,170 +832,153 @@ class CianParser:
             await self.respect_rate_limit()
 
             headers = self.get_random_headers()
-            timeout = aiohttp.ClientTimeout(total=45)
+            session = self._get_session()
 
-            async with aiohttp.ClientSession(headers=headers, timeout=timeout) as session:
-                async with session.get(url) as response:
+            async with self._sem:
+                async with session.get(url, headers=headers) as response:
                     if response.status != 200:
                         logger.error(f"Ошибка HTTP при запросе к Cian: {response.status}")
                         return apartments
 
-                    html = await response.text()
-                    logger.info(f"Получен HTML размером {len(html)} символов")
+                    html_bytes = await response.read()
+                    logger.info(f"Получен HTML размером {len(html_bytes)} байт")
 
-                    soup = BeautifulSoup(html, 'html.parser')
+            return await asyncio.to_thread(self._parse_html_sync, html_bytes, max_price)
 
-                    items = soup.select('[data-name="CardComponent"]')
+        except Exception as e:
+            logger.error(f"Ошибка при парсинге Cian: {e}")
+            return apartments
 
-                    if not items:
-                        logger.warning("Не найдено объявлений на Cian")
-                        return apartments
+    def _parse_html_sync(self, html_bytes: bytes, max_price: int) -> List[Apartment]:
+        """Синхронный разбор списка объявлений; выполняется в отдельном потоке"""
+        apartments = []
 
-                    logger.info(f"Найдено {len(items)} элементов на Cian")
+        try:
+            tree = HTMLParser(html_bytes)
 
-                    for i, item in enumerate(items[:15]):
-                        try:
-                            title_elem = item.select_one('[data-mark="OfferTitle"]')
-                            if not title_elem:
-                                title_elem = item.select_one('a[href*="/rent/flat/"]')
+            items = tree.css('[data-name="CardComponent"]')
 
-                            if not title_elem:
-                                continue
+            if not items:
+                logger.warning("Не найдено объявлений на Cian")
+                return apartments
 
-                            title = title_elem.get_text(strip=True)
+            logger.info(f"Найдено {len(items)} элементов на Cian")
 
-                            link_elem = item.find('a', href=lambda x: x and '/rent/flat/' in x)
-                            if not link_elem:
-                                continue
+            for i, item in enumerate(items[:15]):
+                try:
+                    title_elem = item.css_first('[data-mark="OfferTitle"]')
+                    if not title_elem:
+                        title_elem = item.css_first('a[href*="/rent/flat/"]')
 
-                            link_url = link_elem.get('href', '')
+                    if not title_elem:
+                        continue
 
-                            price_elem = item.select_one('[data-mark="MainPrice"]')
-                            if not price_elem:
-                                continue
+                    title = title_elem.text(strip=True)
 
-                            price_text = price_elem.get_text(strip=True)
-                            price = self.extract_price(price_text)
+                    link_elem = item.css_first('a[href*="/rent/flat/"]')
+                    if not link_elem:
+                        continue
 
-                            if price is None or price > max_price:
-                                continue
+                    link_url = link_elem.attributes.get('href') or ''
+
+                    price_elem = item.css_first('[data-mark="MainPrice"]')
+                    if not price_elem:
+                        continue
+
+                    price_text = price_elem.text(strip=True)
+                    price = self.extract_price(price_text)
+
+                    if price is None or price > max_price:
+                        continue
 
-                            if link_url.startswith('/'):
-                                full_url = self.base_url + link_url
-                            else:
-                                full_url = link_url
-
-                            apartment_id = f"cian_{abs(hash(full_url)) % 1000000}"
-
-                            location_parts = []
-
-                            address_selectors = [
-                                '[data-name="GeoLabel"]',
-                                '[data-mark="GeoLabel"]',
-                                '.a10a3f92e9--address--SMU25',
-                                '.a10a3f92e9--geo--RNXJ5',
-                                '[data-name="AddressContainer"]'
-                            ]
-
-                            for selector in address_selectors:
-                                location_elems = item.select(selector)
-                                for location_elem in location_elems:
-                                    location_text = location_elem.get_text(strip=True)
-                                    if location_text and len(location_text) > 5:
-                                        location_parts.append(location_text)
-
-                            if not location_parts:
-                                item_text = item.get_text()
-                                address_patterns = [
-                                    r'Новосибирская\s+область,\s*Новосибирск,\s*[^,\n]+(?:,\s*метро\s*[^,\n]+\s*\d+\s*м)?',
-                                    r'Новосибирск,\s*[^,\n]+(?:,\s*метро\s*[^,\n]+)?',
-                                    r'г\.\s*Новосибирск,\s*[^,\n]+(?:,\s*метро\s*[^,\n]+)?',
-                                    r'ул\.\s*[А-Яа-я\s\-]+(?:,\s*\d+[^,\n]*)?(?:,\s*метро\s*[^,\n]+)?',
-                                    r'пр\.\s*[А-Яа-я\s\-]+(?:,\s*\d+[^,\n]*)?(?:,\s*метро\s*[^,\n]+)?'
-                                ]
-
-                                for pattern in address_patterns:
-                                    matches = re.findall(pattern, item_text)
-                                    if matches:
-                                        location_parts.extend(matches[:2])
-                                        break
-
-                            if location_parts:
-                                full_location = ", ".join(set(location_parts))
-                                location = full_location[:100] if len(full_location) <= 100 else full_location[
-                                                                                                 :97] + "..."
-                            else:
-                                location = "Новосибирск"
-
-                            area = "Не указано"
-
-                            area_elem = item.select_one('[data-mark="OfferSummary"]')
+                    if link_url.startswith('/'):
+                        full_url = self.base_url + link_url
+                    else:
+                        full_url = link_url
+
+                    apartment_id = 'cian_' + hashlib.blake2b(full_url.encode(), digest_size=6).hexdigest()
+
+                    item_text = item.text(separator=' ', strip=True)
+                    title_and_text = (title + " " + item_text).casefold()
+
+                    location_parts = []
+
+                    for selector in self.ADDRESS_SELECTORS:
+                        location_elems = item.css(selector)
+                        for location_elem in location_elems:
+                            location_text = location_elem.text(strip=True)
+                            if location_text and len(location_text) > 5:
+                                location_parts.append(location_text)
+
+                    if not location_parts:
+                        hits = CIAN_ADDRESS_SET.Match(item_text)
+                        if hits:
+                            matches = CIAN_ADDRESS_PATTERNS[min(hits)].findall(item_text)
+                            location_parts.extend(matches[:2])
+
+                    if location_parts:
+                        full_location = ", ".join(dict.fromkeys(location_parts))
+                        location = (full_location[:97] + "...") if len(full_location) > 100 else full_location
+                    else:
+                        location = "Новосибирск"
+
+                    area = "Не указано"
+
+                    area_elem = item.css_first('[data-mark="OfferSummary"]')
+                    if area_elem:
+                        area_text = area_elem.text(strip=True)
+                        area_match = M2_RE.search(area_text)
+                        if area_match:
+                            area = f"{area_match.group(1)} м²"
+
+                    if area == "Не указано":
+                        for selector in self.AREA_SELECTORS:
+                            area_elem = item.css_first(selector)
                             if area_elem:
-                                area_text = area_elem.get_text(strip=True)
-                                area_match = re.search(r'(\d+(?:,\d+)?)\s*м²', area_text)
+                                area_text = area_elem.text(strip=True)
+                                area_match = M2_RE.search(area_text)
                                 if area_match:
                                     area = f"{area_match.group(1)} м²"
+                                    break
 
-                            if area == "Не указано":
-                                area_selectors = [
-                                    '[data-mark*="Area"]',
-                                    '.a10a3f92e9--area--3xKvp',
-                                    '[title*="м²"]',
-                                    '[data-testid*="area"]'
-                                ]
-
-                                for selector in area_selectors:
-                                    area_elem = item.select_one(selector)
-                                    if area_elem:
-                                        area_text = area_elem.get_text(strip=True)
-                                        area_match = re.search(r'(\d+(?:,\d+)?)\s*м²', area_text)
-                                        if area_match:
-                                            area = f"{area_match.group(1)} м²"
-                                            break
-
-                            if area == "Не указано":
-                                item_text = item.get_text()
-                                area_matches = re.findall(r'(\d+(?:,\d+)?)\s*м²', item_text)
-                                if area_matches:
-                                    area = f"{area_matches[0]} м²"
-
-                            rooms = 1
-                            room_patterns = [
-                                r'(\d+)-комн',
-                                r'(\d+)\s*комн',
-                                r'(\d+)-к',
-                                r'(\d+)к'
-                            ]
-
-                            title_and_text = f"{title} {item.get_text()}"
-                            for pattern in room_patterns:
-                                room_match = re.search(pattern, title_and_text, re.IGNORECASE)
-                                if room_match:
-                                    try:
-                                        rooms = int(room_match.group(1))
-                                        if 1 <= rooms <= 10:
-                                            break
-                                    except:
-                                        continue
-
-                            apartment = Apartment(
-                                id=apartment_id,
-                                title=title[:200],
-                                price=price,
-                                url=full_url,
-                                location=location[:100],
-                                rooms=rooms,
-                                area=area[:50],
-                                source="Cian",
-                                created_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                            )
-
-                            apartments.append(apartment)
-                            logger.info(f"Найдена квартира: {title[:50]}... - {price} ₽")
-
-                        except Exception as e:
-                            logger.error(f"Ошибка при обработке элемента Cian {i + 1}: {e}")
-                            continue
+                    if area == "Не указано":
+                        area_matches = M2_RE.findall(item_text)
+                        if area_matches:
+                            area = f"{area_matches[0]} м²"
+
+                    rooms = 1
+                    for pattern in ROOM_PATTERNS:
+                        room_match = pattern.search(title_and_text)
+                        if room_match:
+                            try:
+                                rooms = int(room_match.group(1))
+                                if 1 <= rooms <= 10:
+                                    break
+                            except:
+                                continue
+
+                    if not location_parts and area == "Не указано":
+                        logger.debug(f"Элемент Cian {i + 1} не похож на карточку объявления, пропускаем")
+                        continue
+
+                    apartment = Apartment(
+                        id=apartment_id,
+                        title=title[:200],
+                        price=price,
+                        url=full_url,
+                        location=location[:100],
+                        rooms=rooms,
+                        area=area[:50],
+                        source="Cian",
+                        created_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                    )
+
+                    apartments.append(apartment)
+                    logger.info(f"Найдена квартира: {title[:50]}... - {price} ₽")
+
+                except (AttributeError, ValueError, KeyError) as e:
+                    logger.debug(f"Ошибка при обработке элемента Cian {i + 1}: {e}")
+                    continue
 
         except Exception as e:
             logger.error(f"Ошибка при парсинге Cian: {e}")
@@ -855,6 +988,22 @@ class CianParser:
 
 
 class TelegramNotifier:
+    MESSAGE_TEMPLATE = (
+        "🏠 *Новая квартира найдена!*\n"
+        "\n"
+        "📍 *Локация:* {location}\n"
+        "💰 *Цена:* {price:,} ₽/мес\n"
+        "🏠 *Комнат:* {rooms}\n"
+        "📐 *Площадь:* {area}\n"
+        "🌐 *Источник:* {source}\n"
+        "\n"
+        "*{title}*\n"
+        "\n"
+        "🔗 [Посмотреть объявление]({url})\n"
+        "\n"
+        "⏰ Найдено: {created_at}"
+    )
+
     def __init__(self, bot_token: str, channel_id: str):
         self.bot = Bot(token=bot_token)
         self.channel_id = channel_id
@@ -862,21 +1011,7 @@ class TelegramNotifier:
     async def send_apartment_notification(self, apartment: Dict[str, Any]):
         """Отправка уведомления о новой квартире"""
         try:
-            message = f"""
-🏠 *Новая квартира найдена!*
-
-📍 *Локация:* {apartment['location']}
-💰 *Цена:* {apartment['price']:,} ₽/мес
-🏠 *Комнат:* {apartment['rooms']}
-📐 *Площадь:* {apartment['area']}
-🌐 *Источник:* {apartment['source']}
-
-*{apartment['title']}*
-
-🔗 [Посмотреть объявление]({apartment['url']})
-
-⏰ Найдено: {apartment['created_at']}
-            """.strip()
+            message = self.MESSAGE_TEMPLATE.format_map(apartment)
 
             await self.bot.send_message(
                 chat_id=self.channel_id,
@@ -906,86 +1041,108 @@ class ApartmentMonitor:
             self.notifier = None
             logger.warning("Telegram настройки не найдены. Уведомления отключены.")
 
-        fix_database_if_needed(self.db.db_path)
+        self._send_limiter = AsyncLimiter(1, 1)  # ~1 сообщение в секунду в канал
 
-    async def monitor_apartments(self):
-        """Основной цикл мониторинга"""
-        urls = [
+        self.urls = [
             "https://www.avito.ru/novosibirsk/kvartiry/sdam/na_dlitelnyy_srok/3-komnatnye-ASgBAgICA0SSA8gQ8AeQUswIklk",
             "https://novosibirsk.cian.ru/cat.php?deal_type=rent&engine_version=2&foot_min=15&metro%5B0%5D=248&metro%5B1%5D=249&metro%5B2%5D=250&metro%5B3%5D=251&metro%5B4%5D=252&metro%5B5%5D=257&metro%5B6%5D=258&offer_type=flat&only_foot=2&room3=1&sort=price_object_order&type=4"
         ]
 
-        while True:
-            try:
-                logger.info("=" * 50)
-                logger.info("Начинаем новый цикл мониторинга квартир...")
+        fix_database_if_needed(self.db.db_path)
 
-                all_apartments = []
+    async def monitor_apartments(self):
+        """Запуск мониторинга по расписанию"""
+        await self.db.init()
 
-                try:
-                    cian_apartments = await self.cian_parser.parse_apartments(urls[1])
-                    all_apartments.extend(cian_apartments)
-                    logger.info(f"Cian: найдено {len(cian_apartments)} квартир")
-                except Exception as e:
-                    logger.error(f"Ошибка парсинга Cian: {e}")
+        scheduler = AsyncIOScheduler()
+        scheduler.add_job(self._one_cycle, 'interval', seconds=300,
+                          max_instances=1, coalesce=True,
+                          next_run_time=datetime.now())
+        scheduler.start()
 
-                await asyncio.sleep(15)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            scheduler.shutdown(wait=False)
 
-                try:
-                    avito_apartments = await self.avito_parser.parse_apartments(urls[0])
-                    all_apartments.extend(avito_apartments)
-                    logger.info(f"Avito: найдено {len(avito_apartments)} квартир")
-                except Exception as e:
-                    logger.error(f"Ошибка парсинга Avito: {e}")
+    async def _one_cycle(self):
+        """Один цикл мониторинга: парсинг, запись в БД, уведомления"""
+        try:
+            logger.info("=" * 50)
+            logger.info("Начинаем новый цикл мониторинга квартир...")
 
-                logger.info(f"Всего найдено квартир: {len(all_apartments)}")
+            all_apartments = []
 
-                new_apartments_count = 0
-                for apartment in all_apartments:
-                    try:
-                        if self.db.add_apartment(apartment):
-                            new_apartments_count += 1
-                    except Exception as e:
-                        logger.error(f"Ошибка добавления квартиры в БД: {e}")
+            results = await asyncio.gather(
+                self.cian_parser.parse_apartments(self.urls[1]),
+                self.avito_parser.parse_apartments(self.urls[0]),
+                return_exceptions=True
+            )
 
-                logger.info(f"Добавлено {new_apartments_count} новых квартир в БД")
+            for source, result in zip(("Cian", "Avito"), results):
+                if isinstance(result, Exception):
+                    logger.error(f"Ошибка парсинга {source}: {result}")
+                else:
+                    all_apartments.extend(result)
+                    logger.info(f"{source}: найдено {len(result)} квартир")
 
-                if self.notifier and new_apartments_count > 0:
-                    try:
-                        await self.send_notifications()
-                    except Exception as e:
-                        logger.error(f"Ошибка отправки уведомлений: {e}")
+            logger.info(f"Всего найдено квартир: {len(all_apartments)}")
 
-                logger.info("Ожидание 5 минут до следующей проверки...")
-                await asyncio.sleep(300)
+            new_apartments_count = await self.db.add_apartments_bulk(all_apartments)
 
-            except Exception as e:
-                logger.error(f"Критическая ошибка в цикле мониторинга: {e}")
-                logger.info("Ожидание 2 минуты перед повторной попыткой...")
-                await asyncio.sleep(120)
+            logger.info(f"Добавлено {new_apartments_count} новых квартир в БД")
+
+            if self.notifier and new_apartments_count > 0:
+                try:
+                    await self.send_notifications()
+                except Exception as e:
+                    logger.error(f"Ошибка отправки уведомлений: {e}")
+
+        except Exception as e:
+            logger.error(f"Критическая ошибка в цикле мониторинга: {e}")
+
+    async def _send_one(self, apartment, sem, sent_ids):
+        """Отправка одного уведомления под семафором и лимитером скорости"""
+        async with sem:
+            async with self._send_limiter:
+                try:
+                    await self.notifier.send_apartment_notification(apartment)
+                    sent_ids.append(apartment['id'])
+                except Exception as e:
+                    logger.error(f"Ошибка отправки уведомления для квартиры {apartment['id']}: {e}")
 
     async def send_notifications(self):
         """Отправка уведомлений о новых квартирах"""
         try:
-            new_apartments = self.db.get_new_apartments()
+            new_apartments = await self.db.claim_new_apartments()
             logger.info(f"Найдено {len(new_apartments)} новых квартир для уведомления")
 
-            for apartment in new_apartments:
-                try:
-                    await self.notifier.send_apartment_notification(apartment)
-                    self.db.mark_as_notified(apartment['id'])
+            if not new_apartments:
+                return
 
-                    await asyncio.sleep(3)
-                except Exception as e:
-                    logger.error(f"Ошибка отправки уведомления для квартиры {apartment['id']}: {e}")
+            sem = asyncio.Semaphore(1)
+            sent_ids = []
+            await asyncio.gather(*(self._send_one(a, sem, sent_ids) for a in new_apartments))
+
+            failed_ids = [a['id'] for a in new_apartments if a['id'] not in set(sent_ids)]
+            await self.db.requeue_apartments(failed_ids)
         except Exception as e:
             logger.error(f"Ошибка в процессе отправки уведомлений: {e}")
 
+    async def close(self):
+        """Закрытие HTTP-сессий парсеров и соединения с БД"""
+        await self.avito_parser.close()
+        await self.cian_parser.close()
+        await self.db.close()
+
 
 async def main():
     logger.info("Запуск системы мониторинга квартир...")
     monitor = ApartmentMonitor()
-    await monitor.monitor_apartments()
+    try:
+        await monitor.monitor_apartments()
+    finally:
+        await monitor.close()
 
 
 if __name__ == "__main__":
@@ -30,6 +30,8 @@ def setup_database(db_path: str = "data/apartments.db") -> None:
             cursor.execute("PRAGMA journal_mode=WAL")
             cursor.execute("PRAGMA synchronous=NORMAL")
             cursor.execute("PRAGMA cache_size=-10000")
+            cursor.execute("PRAGMA temp_store=MEMORY")
+            cursor.execute("PRAGMA mmap_size=268435456")
 
             cursor.execute('''
             CREATE TABLE IF NOT EXISTS apartments (
@@ -43,7 +45,7 @@ def setup_database(db_path: str = "data/apartments.db") -> None:
                 area TEXT,
                 source TEXT NOT NULL,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                notified BOOLEAN DEFAULT FALSE,
+                notified BOOLEAN DEFAULT FALSE
             )''')
 
             indexes = [
@@ -1,6 +1,4 @@
 import pytest
-import asyncio
-from unittest.mock import Mock, patch
 from main import AvitoParser, CianParser, Database, Apartment
 from datetime import datetime
 
@@ -8,62 +6,79 @@ class TestAvitoParser:
     @pytest.fixture
     def parser(self):
         return AvitoParser()
-    
-    @pytest.mark.asyncio
-    async def test_parse_apartments_success(self, parser):
+
+    def test_parse_html_success(self, parser):
         mock_html = """
-        <div data-marker="item">
-            <h3>Тестовая квартира</h3>
+        <div data-marker="item" data-item-id="123">
+            <a data-marker="item-title" href="/test-apartment-123">3-комн. квартира, 65 м²</a>
             <span data-marker="item-price">25 000 ₽</span>
-            <a href="/test-apartment-123">Ссылка</a>
-            <span data-marker="item-address">Центральный район</span>
+            <span data-marker="item-address">Центральный район, ул. Ленина, 12</span>
         </div>
         """
-        
-        with patch('aiohttp.ClientSession.get') as mock_get:
-            mock_response = Mock()
-            mock_response.status = 200
-            mock_response.text = asyncio.coroutine(lambda: mock_html)
-            mock_get.return_value.__aenter__.return_value = mock_response
-            
-            apartments = await parser.parse_apartments("http://test.url")
-            
-            assert len(apartments) >= 0
+
+        apartments = parser._parse_html_sync(mock_html.encode('utf-8'), 30000)
+
+        assert len(apartments) == 1
+        apartment = apartments[0]
+        assert apartment.id == "avito_123"
+        assert apartment.price == 25000
+        assert apartment.rooms == 3
+        assert apartment.url == "https://www.avito.ru/test-apartment-123"
+        assert apartment.source == "Avito"
+
+    def test_parse_html_filters_expensive(self, parser):
+        mock_html = """
+        <div data-marker="item" data-item-id="456">
+            <a data-marker="item-title" href="/test-apartment-456">3-комн. квартира, 80 м²</a>
+            <span data-marker="item-price">55 000 ₽</span>
+            <span data-marker="item-address">Центральный район, ул. Ленина, 12</span>
+        </div>
+        """
+
+        apartments = parser._parse_html_sync(mock_html.encode('utf-8'), 30000)
+
+        assert apartments == []
 
 class TestCianParser:
     @pytest.fixture
     def parser(self):
         return CianParser()
-    
-    @pytest.mark.asyncio
-    async def test_parse_apartments_success(self, parser):
+
+    def test_parse_html_success(self, parser):
         mock_html = """
         <article data-name="CardComponent">
-            <span data-mark="OfferTitle">Тестовая квартира Cian</span>
+            <span data-mark="OfferTitle">3-комн. квартира Cian</span>
             <span data-mark="MainPrice">28 000 ₽</span>
             <a href="/rent/flat/123/">Ссылка</a>
             <a data-name="GeoLabel">Советский район</a>
             <div data-mark="OfferSummary">65 м²</div>
         </article>
         """
-        
-        with patch('aiohttp.ClientSession.get') as mock_get:
-            mock_response = Mock()
-            mock_response.status = 200
-            mock_response.text = asyncio.coroutine(lambda: mock_html)
-            mock_get.return_value.__aenter__.return_value = mock_response
-            
-            apartments = await parser.parse_apartments("http://test.url")
-            
-            assert len(apartments) >= 0
+
+        apartments = parser._parse_html_sync(mock_html.encode('utf-8'), 30000)
+
+        assert len(apartments) == 1
+        apartment = apartments[0]
+        assert apartment.price == 28000
+        assert apartment.rooms == 3
+        assert apartment.area == "65 м²"
+        assert apartment.location == "Советский район"
+        assert apartment.url == "https://novosibirsk.cian.ru/rent/flat/123/"
+        assert apartment.source == "Cian"
+
+    def test_parse_html_no_items(self, parser):
+        apartments = parser._parse_html_sync(b"<html><body></body></html>", 30000)
+
+        assert apartments == []
 
 class TestDatabase:
     @pytest.fixture
     def db(self, tmp_path):
         db_path = tmp_path / "test.db"
         return Database(str(db_path))
-    
-    def test_add_apartment(self, db):
+
+    @pytest.mark.asyncio
+    async def test_add_apartment(self, db):
         apartment = Apartment(
             id="test_123",
             title="Тестовая квартира",
@@ -75,12 +90,13 @@ class TestDatabase:
             source="Test",
             created_at=datetime.now()
         )
-        
-        assert db.add_apartment(apartment) == True
-        
-        assert db.add_apartment(apartment) == False
-    
-    def test_apartment_exists(self, db):
+
+        assert await db.add_apartment(apartment) == True
+
+        assert await db.add_apartment(apartment) == False
+
+    @pytest.mark.asyncio
+    async def test_apartment_exists(self, db):
         apartment = Apartment(
             id="test_456",
             title="Тестовая квартира 2",
@@ -92,12 +108,12 @@ class TestDatabase:
             source="Test",
             created_at=datetime.now()
         )
-        
-        assert db.apartment_exists("test_456") == False
-        
-        db.add_apartment(apartment)
-        
-        assert db.apartment_exists("test_456") == True
+
+        assert await db.apartment_exists("test_456") == False
+
+        await db.add_apartment(apartment)
+
+        assert await db.apartment_exists("test_456") == True
 
 if __name__ == "__main__":
     pytest.main([__file__])